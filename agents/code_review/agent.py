@@ -11,10 +11,24 @@ Features:
 - PR-ready feedback
 """
 import argparse
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 from core import BaseAgent, AgentConfig
+from core.cache import cache_key
+from .prompt_modules import FOCUS_INSTRUCTIONS, ReviewPrompt
+
+# Code fence language for each supported suffix
+SUFFIX_TO_LANG = {
+    ".py": "python", ".js": "javascript", ".ts": "typescript", ".jsx": "jsx",
+    ".tsx": "tsx", ".go": "go", ".rs": "rust", ".java": "java", ".cpp": "cpp",
+    ".c": "c", ".rb": "ruby", ".php": "php", ".swift": "swift", ".kt": "kotlin",
+}
 
 
 class CodeReviewAgent(BaseAgent):
@@ -24,6 +38,18 @@ class CodeReviewAgent(BaseAgent):
         ".py", ".js", ".ts", ".jsx", ".tsx", ".go", ".rs", 
         ".java", ".cpp", ".c", ".rb", ".php", ".swift", ".kt"
     }
+    _EXTENSION_NAMES = frozenset(ext[1:] for ext in SUPPORTED_EXTENSIONS)
+    
+    # Larger files are skipped rather than reviewed
+    MAX_FILE_SIZE = 50_000
+    
+    # Files up to this many characters are reviewed together in one request
+    BATCH_LIMIT = 20_000
+    
+    def __init__(self, config: AgentConfig | None = None):
+        super().__init__(config)
+        # File bytes read while de-duplicating, reused when building prompts
+        self._sources: dict[Path, bytes] = {}
     
     @property
     def system_prompt(self) -> str:
@@ -71,11 +97,36 @@ Format output as markdown with clear sections."""
         
         self.logger.info(f"Reviewing {len(files)} files")
         
-        # Review each file
+        focus_instruction = FOCUS_INSTRUCTIONS.get(focus, "Review all aspects")
+        
+        # Identical files are reviewed once
+        unique, copies = self._dedupe_files(files[:20])  # Limit to 20 files per run
+        
+        # Skipped and unchanged files need no request; only the rest are batched
+        done: dict[Path, str] = {}
+        sources: dict[Path, str] = {}
+        for file in unique:
+            content, skipped = self._read_source(file)
+            if content is None:
+                done[file] = skipped
+                continue
+            cached = self._cached_review(self._file_prompt(file, focus_instruction, content))
+            if cached is not None:
+                self.logger.info(f"Unchanged: {file.name}")
+                done[file] = cached
+            else:
+                sources[file] = content
+        
+        # Review the rest concurrently, small ones batched into shared requests
+        batches = self._batch_files(sources)
+        results = [([file], review) for file, review in done.items()]
+        results += zip(batches, asyncio.run(self._review_batches(batches, sources, focus_instruction)))
         reviews = []
-        for file in files[:20]:  # Limit to 20 files per run
-            review = self._review_file(file, focus)
-            reviews.append((file, review))
+        for batch, review in sorted(results, key=lambda item: item[0][0]):
+            same = [copy for file in batch for copy in copies.get(file, [])]
+            if same:
+                review += f"\n\n_Identical files sharing this review: {', '.join(copy.name for copy in same)}_"
+            reviews.append((batch + same, review))
         
         # Synthesize overall report
         report = self._create_summary(reviews, focus)
@@ -97,65 +148,186 @@ Format output as markdown with clear sections."""
         files = []
         
         exclude = exclude or ["node_modules", "venv", ".git", "__pycache__", "dist", "build"]
+        exclude_names = frozenset(exclude)
+        exclude_re = re.compile("|".join(map(re.escape, exclude)))
         
-        for file in directory.rglob("*"):
-            if not file.is_file():
-                continue
-            if file.suffix not in self.SUPPORTED_EXTENSIONS:
-                continue
-            if any(ex in str(file) for ex in exclude):
-                continue
-            if include and not any(file.match(inc) for inc in include):
-                continue
-            files.append(file)
+        def scan(path: str) -> tuple[list[Path], list[str]]:
+            """List one directory: matching files and subdirectories to visit."""
+            found, subdirs = [], []
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                return found, subdirs
+            for entry in entries:
+                if entry.name in exclude_names:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                stem, _, ext = entry.name.rpartition(".")
+                if not stem or ext not in self._EXTENSION_NAMES:
+                    continue
+                if exclude_re.search(entry.path):
+                    continue
+                file = Path(entry.path)
+                if include and not any(file.match(inc) for inc in include):
+                    continue
+                if not entry.is_file():
+                    continue
+                found.append(file)
+            return found, subdirs
+        
+        # Walk level by level, scanning each level's directories in parallel;
+        # excluded directories are never entered. Stat latency dominates on
+        # network filesystems, so threads help even under the GIL.
+        workers = min(32, (os.cpu_count() or 4) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            level = [str(directory)]
+            while level:
+                next_level = []
+                for found, subdirs in pool.map(scan, level):
+                    files.extend(found)
+                    next_level.extend(subdirs)
+                level = next_level
         
         return sorted(files)
     
-    def _review_file(self, file: Path, focus: str) -> str:
-        """Review a single file."""
-        self.logger.info(f"Reviewing: {file.name}")
+    def _dedupe_files(self, files: list[Path]) -> tuple[list[Path], dict[Path, list[Path]]]:
+        """Split files into unique ones and byte-identical copies of them.
         
-        try:
-            content = file.read_text()
-        except Exception as e:
-            return f"Error reading file: {e}"
+        Returns the unique files and a map from each to its copies. The
+        bytes read for hashing are kept in ``self._sources`` for review.
+        """
+        self._sources = {}
+        seen: dict[str, Path] = {}
+        unique = []
+        copies: dict[Path, list[Path]] = {}
+        for file in files:
+            try:
+                size = file.stat().st_size
+                data = file.read_bytes() if 0 < size <= self.MAX_FILE_SIZE else None
+            except OSError:
+                data = None
+            if data is None:
+                unique.append(file)
+                continue
+            
+            original = seen.setdefault(hashlib.blake2b(data, digest_size=16).hexdigest(), file)
+            if original is file:
+                unique.append(file)
+                self._sources[file] = data
+            else:
+                copies.setdefault(original, []).append(file)
+        
+        return unique, copies
+    
+    def _batch_files(self, sources: dict[Path, str]) -> list[list[Path]]:
+        """Bin-pack small sources into batches of at most BATCH_LIMIT characters."""
+        sized = []
+        batches = []
+        for file, content in sources.items():
+            if len(content) > self.BATCH_LIMIT:
+                batches.append([file])
+            else:
+                sized.append((len(content), file))
         
-        # Skip very large files
-        if len(content) > 50000:
-            return "File too large for review (>50KB)"
+        # First-fit decreasing
+        bins: list[list[Path]] = []
+        totals: list[int] = []
+        for size, file in sorted(sized, key=lambda item: item[0], reverse=True):
+            for i, total in enumerate(totals):
+                if total + size <= self.BATCH_LIMIT:
+                    totals[i] += size
+                    bins[i].append(file)
+                    break
+            else:
+                bins.append([file])
+                totals.append(size)
         
-        # Skip empty files
+        batches.extend(sorted(batch) for batch in bins)
+        return sorted(batches, key=lambda batch: batch[0])
+    
+    async def _review_batches(
+        self, batches: list[list[Path]], sources: dict[Path, str], focus_instruction: str
+    ) -> list[str]:
+        """Review batches concurrently, bounded by ``config.max_concurrency``."""
+        return await self.gather_bounded(
+            *(self._review_batch_async(batch, sources, focus_instruction) for batch in batches)
+        )
+    
+    async def _review_batch_async(
+        self, batch: list[Path], sources: dict[Path, str], focus_instruction: str
+    ) -> str:
+        """Review a batch in a worker thread."""
+        if len(batch) == 1:
+            file = batch[0]
+            return await asyncio.to_thread(self._review_file, file, focus_instruction, sources[file])
+        return await asyncio.to_thread(
+            self._review_batch, [(file, sources[file]) for file in batch], focus_instruction
+        )
+    
+    def _read_source(self, file: Path) -> tuple[str | None, str | None]:
+        """Read a file for review, returning (content, reason it was skipped)."""
+        data = self._sources.get(file)
+        if data is not None:
+            content = data.decode("utf-8", errors="replace")
+        else:
+            # Check size before reading so huge files are never loaded
+            try:
+                size = file.stat().st_size
+                if size > self.MAX_FILE_SIZE:
+                    return None, "File too large for review (>50KB)"
+                if size == 0:
+                    return None, "Empty file"
+                content = file.read_text(encoding="utf-8", errors="replace")
+            except Exception as e:
+                return None, f"Error reading file: {e}"
+        
+        # Skip whitespace-only files
         if not content.strip():
-            return "Empty file"
+            return None, "Empty file"
+        
+        return content, None
+    
+    def _file_prompt(self, file: Path, focus_instruction: str, content: str) -> ReviewPrompt:
+        """Review prompt for one file."""
+        return ReviewPrompt.build(
+            self.system_prompt, focus_instruction, file.name, SUFFIX_TO_LANG.get(file.suffix, file.suffix[1:]), content
+        )
+    
+    def _cached_review(self, review: ReviewPrompt) -> str | None:
+        """Previous review for the same prompt, if the response cache has one."""
+        cache = self.response_cache
+        return cache.get(self._review_key(review)) if cache else None
+    
+    def _review_key(self, review: ReviewPrompt) -> str:
+        """Cache key for a review request."""
+        return cache_key(self.llm.model, *review.system, review.prompt)
+    
+    def _review_file(self, file: Path, focus_instruction: str, content: str) -> str:
+        """Review a single file."""
+        self.logger.info(f"Reviewing: {file.name}")
         
-        focus_instruction = {
-            "all": "Review all aspects: quality, security, performance, best practices",
-            "security": "Focus primarily on security vulnerabilities and risks",
-            "performance": "Focus primarily on performance and efficiency",
-            "quality": "Focus primarily on code quality and maintainability",
-        }.get(focus, "Review all aspects")
+        review = self._file_prompt(file, focus_instruction, content)
         
-        prompt = f"""Review this code file: {file.name}
-
-{focus_instruction}
-
-```{file.suffix[1:]}
-{content}
-```
-
-Provide a structured review with:
-1. Summary (1-2 sentences)
-2. Issues found (with severity ratings)
-3. Specific improvement suggestions with code examples
-4. What's done well (positive feedback)"""
+        # Unchanged files with the same name, focus and rubric reuse their previous review
+        return self.ask_cached(review.prompt, key=self._review_key(review), system=review.system)
+    
+    def _review_batch(self, sources: list[tuple[Path, str]], focus_instruction: str) -> str:
+        """Review several small files in a single request."""
+        self.logger.info(f"Reviewing together: {', '.join(file.name for file, _ in sources)}")
         
-        return self.ask(prompt)
+        review = ReviewPrompt.build_batch(self.system_prompt, focus_instruction, [
+            (file.name, SUFFIX_TO_LANG.get(file.suffix, file.suffix[1:]), content)
+            for file, content in sources
+        ])
+        return self.ask_cached(review.prompt, key=self._review_key(review), system=review.system)
     
-    def _create_summary(self, reviews: list[tuple[Path, str]], focus: str) -> str:
+    def _create_summary(self, reviews: list[tuple[list[Path], str]], focus: str) -> str:
         """Create overall review summary."""
         review_text = "\n\n".join([
-            f"### {file.name}\n{review}" 
-            for file, review in reviews
+            f"### {', '.join(file.name for file in files)}\n{review}" 
+            for files, review in reviews
         ])
         
         prompt = f"""Create an executive summary of this code review.
@@ -180,7 +352,7 @@ Be concise but actionable."""
 
 Generated: {datetime.now().strftime("%Y-%m-%d %H:%M")}
 Focus: {focus}
-Files reviewed: {len(reviews)}
+Files reviewed: {sum(len(files) for files, _ in reviews)}
 
 ---
 
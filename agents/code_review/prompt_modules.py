@@ -0,0 +1,98 @@
+"""Prompt modules for per-file code reviews.
+
+A review prompt is assembled from tagged modules, PML-style: the static
+``rubric`` and ``format`` modules are the literal prefix of every request
+in a run and only the ``file`` module varies. Hosted providers cache that
+prefix via the system blocks; servers with prefix caching (e.g. vLLM with
+``--enable-prefix-caching``) reuse its KV state across files.
+"""
+from dataclasses import dataclass
+
+FOCUS_INSTRUCTIONS = {
+    "all": "Review all aspects: quality, security, performance, best practices",
+    "security": "Focus primarily on security vulnerabilities and risks",
+    "performance": "Focus primarily on performance and efficiency",
+    "quality": "Focus primarily on code quality and maintainability",
+}
+
+REVIEW_FORMAT = """Provide a structured review with:
+1. Summary (1-2 sentences)
+2. Issues found (with severity ratings)
+3. Specific improvement suggestions with code examples
+4. What's done well (positive feedback)"""
+
+
+@dataclass(frozen=True)
+class PromptModule:
+    """A named chunk of prompt text."""
+    name: str
+    text: str
+
+    def render(self) -> str:
+        """Render the module wrapped in its tag."""
+        return f"<{self.name}>\n{self.text}\n</{self.name}>"
+
+
+def _static_modules(system_prompt: str, focus_instruction: str) -> tuple[PromptModule, PromptModule]:
+    """The rubric and format modules shared by every request in a run."""
+    return (
+        PromptModule("rubric", f"{system_prompt}\n\n{focus_instruction}"),
+        PromptModule("format", REVIEW_FORMAT),
+    )
+
+
+@dataclass(frozen=True)
+class ReviewPrompt:
+    """Per-file review prompt: static rubric and format, variable file."""
+    rubric: PromptModule
+    format: PromptModule
+    file: PromptModule
+
+    @classmethod
+    def build(
+        cls,
+        system_prompt: str,
+        focus_instruction: str,
+        name: str,
+        lang: str,
+        content: str,
+    ) -> "ReviewPrompt":
+        """Assemble the modules for one file."""
+        return cls(
+            *_static_modules(system_prompt, focus_instruction),
+            file=PromptModule(
+                "file",
+                f"Review this code file: {name}\n\n```{lang}\n{content}\n```",
+            ),
+        )
+
+    @classmethod
+    def build_batch(
+        cls,
+        system_prompt: str,
+        focus_instruction: str,
+        sources: list[tuple[str, str, str]],
+    ) -> "ReviewPrompt":
+        """Assemble the modules for several ``(name, lang, content)`` files."""
+        files = "\n\n".join(
+            f"=== {name} ===\n```{lang}\n{content}\n```" for name, lang, content in sources
+        )
+        return cls(
+            *_static_modules(system_prompt, focus_instruction),
+            file=PromptModule(
+                "files",
+                f"Review these {len(sources)} files together. Give each file its own "
+                f"review, then note any cross-file issues (duplicated logic, "
+                f"inconsistent patterns).\n\n{files}",
+            ),
+        )
+
+    @property
+    def system(self) -> list[str]:
+        """Static modules, sent as cacheable system blocks."""
+        return [self.rubric.render(), self.format.render()]
+
+    @property
+    def prompt(self) -> str:
+        """Variable module, sent as the user message."""
+        return self.file.render()
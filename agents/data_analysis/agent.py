@@ -12,24 +12,55 @@ Features:
 - Visualization suggestions
 """
 import argparse
+import importlib.util
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from core import BaseAgent, AgentConfig
+from core.cache import cache_key
 
-try:
+if TYPE_CHECKING:
     import pandas as pd
-    import numpy as np
-    HAS_PANDAS = True
-except ImportError:
-    HAS_PANDAS = False
+
+# pandas & co. are imported on first use so --help and error paths stay fast
+HAS_PANDAS = all(importlib.util.find_spec(m) is not None for m in ("pandas", "numpy"))
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+
+
+def _dumps_profile(profile: dict[str, Any]) -> str:
+    """Serialize a data profile for a prompt.
+    
+    orjson keeps numpy scalars numeric (stdlib ``default=str`` turns them
+    into strings) and is much faster on wide profiles.
+    """
+    if HAS_ORJSON:
+        import orjson
+        
+        try:
+            return orjson.dumps(
+                profile,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            ).decode()
+        except TypeError:
+            pass  # e.g. an unsupported key type; the stdlib encoder copes
+    return json.dumps(profile, indent=2, default=str)
 
 
 class DataAnalysisAgent(BaseAgent):
     """Agent that analyzes datasets and generates actionable insights."""
     
+    # Distribution stats are computed on a sample above this many rows
+    PROFILE_SAMPLE_ROWS = 1_000_000
+    
+    def __init__(self, config: AgentConfig | None = None):
+        super().__init__(config)
+        # Profiles of the dataframes seen in the current run, keyed by id(df)
+        self._profiles: dict[int, dict[str, Any]] = {}
+    
     @property
     def system_prompt(self) -> str:
         return """You are a senior data analyst. Your job is to:
@@ -64,11 +95,13 @@ Format output as markdown with clear sections."""
         
         file_path = Path(file_path)
         self.logger.info(f"Analyzing: {file_path.name}")
+        self._profiles.clear()
         
         # Load data
         df = self._load_data(file_path)
         if df is None:
             return f"Error: Could not load {file_path}"
+        df = self._downcast(df)
         
         # Generate data profile
         profile = self._profile_data(df)
@@ -91,8 +124,20 @@ Format output as markdown with clear sections."""
     
     def _load_data(self, path: Path) -> "pd.DataFrame | None":
         """Load data from file."""
+        import pandas as pd
+        
+        # pyarrow's JSON reader is newline-delimited only and would read a
+        # pandas-style .json document as one row, so .json stays on pandas
+        if HAS_PYARROW and path.suffix in (".csv", ".parquet"):
+            try:
+                return self._load_arrow(path)
+            except Exception as e:
+                self.logger.debug(f"pyarrow could not read {path.name}, using pandas: {e}")
+        
         try:
             if path.suffix == ".csv":
+                if HAS_PYARROW:
+                    return pd.read_csv(path, dtype_backend="pyarrow")
                 return pd.read_csv(path)
             elif path.suffix == ".json":
                 return pd.read_json(path)
@@ -107,31 +152,89 @@ Format output as markdown with clear sections."""
             self.logger.error(f"Error loading data: {e}")
             return None
     
+    def _load_arrow(self, path: Path) -> "pd.DataFrame":
+        """Load with pyarrow's multi-threaded readers, keeping Arrow-backed columns."""
+        import pandas as pd
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pa_parquet
+        
+        if path.suffix == ".csv":
+            table = pa_csv.read_csv(path, read_options=pa_csv.ReadOptions(block_size=64 << 20))
+        else:
+            table = pa_parquet.read_table(path)
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    
+    def _downcast(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """Shrink dtypes so profiling scans fewer bytes.
+        
+        Numerics are narrowed to the smallest type that holds their values
+        exactly and low-cardinality string columns become categoricals.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        for col in df.select_dtypes(include=[np.integer]).columns:
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        for col in df.select_dtypes(include=[np.floating]).columns:
+            # Only when lossless: float32 turns 5.1 into 5.099999904632568
+            narrowed = pd.to_numeric(df[col], downcast="float")
+            if narrowed.dtype != df[col].dtype and narrowed.astype(df[col].dtype).equals(df[col]):
+                df[col] = narrowed
+        if len(df):
+            for col in df.select_dtypes(include=["object", "string"]).columns:
+                if df[col].nunique() / len(df) < 0.5:
+                    df[col] = df[col].astype("category")
+        return df
+    
     def _profile_data(self, df: "pd.DataFrame") -> dict[str, Any]:
-        """Generate data profile."""
+        """Generate data profile (memoized per dataframe within a run)."""
+        cached = self._profiles.get(id(df))
+        if cached is not None:
+            return cached
+        
+        import numpy as np
+        
+        # count() reduces column by column instead of building a full boolean mask
+        null_counts = len(df) - df.count()
         profile = {
             "rows": len(df),
             "columns": len(df.columns),
             "column_names": list(df.columns),
             "dtypes": df.dtypes.astype(str).to_dict(),
-            "missing": df.isnull().sum().to_dict(),
-            "missing_pct": (df.isnull().sum() / len(df) * 100).round(2).to_dict(),
+            "missing": null_counts.to_dict(),
+            "missing_pct": (null_counts / len(df) * 100).round(2).to_dict(),
         }
         
+        # Columns with no values at all have nothing to profile
+        has_values = set(null_counts.index[null_counts < len(df)])
+        
+        # Counts above are exact; distributions converge long before 1M rows
+        stats_df = df
+        if len(df) > self.PROFILE_SAMPLE_ROWS:
+            stats_df = df.sample(n=self.PROFILE_SAMPLE_ROWS, random_state=0)
+            profile["sampled"] = True
+            profile["sample_size"] = self.PROFILE_SAMPLE_ROWS
+        
         # Numeric columns stats
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) > 0:
-            profile["numeric_stats"] = df[numeric_cols].describe().to_dict()
+        numeric_cols = [
+            col for col in df.select_dtypes(include=[np.number]).columns if col in has_values
+        ]
+        if numeric_cols:
+            profile["numeric_stats"] = stats_df[numeric_cols].describe().to_dict()
         
         # Categorical columns
-        cat_cols = df.select_dtypes(include=["object", "category"]).columns
-        if len(cat_cols) > 0:
+        cat_cols = [
+            col for col in df.select_dtypes(include=["object", "category"]).columns
+            if col in has_values
+        ][:10]  # Limit to 10 columns
+        if cat_cols:
+            unique = stats_df[cat_cols].nunique()
             profile["categorical_stats"] = {
                 col: {
-                    "unique": df[col].nunique(),
-                    "top_values": df[col].value_counts().head(5).to_dict()
+                    "unique": unique[col],
+                    "top_values": self._top_values(stats_df[col], unique[col]),
                 }
-                for col in cat_cols[:10]  # Limit to 10 columns
+                for col in cat_cols
             }
         
         # Date columns
@@ -145,8 +248,20 @@ Format output as markdown with clear sections."""
         # Sample data
         profile["sample"] = df.head(5).to_dict()
         
+        # Serialized once here; every prompt that embeds the profile reuses it
+        profile["_serialized"] = _dumps_profile(profile)
+        
+        self._profiles[id(df)] = profile
         return profile
     
+    def _top_values(self, series: "pd.Series", unique: int) -> dict:
+        """Most frequent values; constant columns skip the value_counts pass."""
+        if unique > 1:
+            return series.value_counts().head(5).to_dict()
+        if unique == 0:
+            return {}  # values exist outside the sample only
+        return {series.loc[series.first_valid_index()]: series.count()}
+    
     def _comprehensive_analysis(
         self,
         df: "pd.DataFrame",
@@ -154,7 +269,7 @@ Format output as markdown with clear sections."""
         analysis_type: str
     ) -> str:
         """Run comprehensive analysis."""
-        profile_text = json.dumps(profile, indent=2, default=str)
+        profile_text = profile["_serialized"]
         
         depth_instruction = {
             "quick": "Provide a quick overview with key insights only (3-5 main points)",
@@ -162,12 +277,8 @@ Format output as markdown with clear sections."""
             "deep": "Provide exhaustive analysis with statistical tests and detailed patterns",
         }.get(analysis_type, "Provide thorough analysis")
         
-        prompt = f"""Analyze this dataset:
-
-Data Profile:
-{profile_text}
-
-{depth_instruction}
+        # Static rubric goes in the system blocks, ahead of the per-dataset profile
+        instructions = f"""{depth_instruction}
 
 Cover these areas:
 1. **Data Quality**: Missing values, outliers, data types
@@ -180,7 +291,12 @@ Cover these areas:
 
 Be specific with numbers. Reference actual column names and values."""
         
-        return self.ask(prompt)
+        prompt = f"""Analyze this dataset:
+
+Data Profile:
+{profile_text}"""
+        
+        return self.ask(prompt, system=[self.system_prompt, instructions])
     
     def _answer_question(
         self,
@@ -189,16 +305,9 @@ Be specific with numbers. Reference actual column names and values."""
         question: str
     ) -> str:
         """Answer a specific question about the data."""
-        profile_text = json.dumps(profile, indent=2, default=str)
+        profile_text = profile["_serialized"]
         
-        prompt = f"""Answer this question about the dataset:
-
-Question: {question}
-
-Data Profile:
-{profile_text}
-
-Provide a direct answer with:
+        instructions = """Provide a direct answer with:
 1. The answer to the question
 2. Supporting evidence from the data
 3. Any caveats or limitations
@@ -206,7 +315,23 @@ Provide a direct answer with:
 
 Be specific with numbers and reference actual data values."""
         
-        return self.ask(prompt)
+        # Profile before question: repeated questions on one dataset share the prefix
+        prompt = f"""Answer this question about the dataset.
+
+Data Profile:
+{profile_text}
+
+Question: {question}"""
+        
+        # Paraphrased questions about the same profile can reuse an answer
+        namespace = cache_key(self.llm.model, profile_text)
+        return self.ask_cached(
+            prompt,
+            key=cache_key(namespace, question),
+            system=[self.system_prompt, instructions],
+            similar=question,
+            namespace=namespace,
+        )
     
     def _create_report(
         self,
@@ -249,13 +374,15 @@ Be specific with numbers and reference actual data values."""
     
     def _columns_table(self, profile: dict[str, Any]) -> str:
         """Generate columns table."""
-        rows = []
-        for col in profile['column_names']:
-            dtype = profile['dtypes'].get(col, 'unknown')
-            missing = profile['missing'].get(col, 0)
-            missing_pct = profile['missing_pct'].get(col, 0)
-            rows.append(f"| {col} | {dtype} | {missing:,} | {missing_pct}% |")
-        return "\n".join(rows)
+        names = profile['column_names']
+        dtypes, missing, missing_pct = profile['dtypes'], profile['missing'], profile['missing_pct']
+        return "\n".join(map(
+            "| {} | {} | {:,} | {}% |".format,
+            names,
+            (dtypes.get(col, 'unknown') for col in names),
+            (missing.get(col, 0) for col in names),
+            (missing_pct.get(col, 0) for col in names),
+        ))
 
 
 def main():
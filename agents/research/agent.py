@@ -11,11 +11,15 @@ Features:
 - Export to Markdown/PDF
 """
 import argparse
+import asyncio
+import re
 from datetime import datetime
 from pathlib import Path
 
 from core import BaseAgent, AgentConfig
 
+SECTION_RE = re.compile(r"^## ", re.MULTILINE)
+
 
 class ResearchAgent(BaseAgent):
     """Agent that conducts research and generates comprehensive reports."""
@@ -38,6 +42,7 @@ Use markdown formatting for structure."""
         depth: str = "standard",  # quick, standard, deep
         focus_areas: list[str] | None = None,
         output_format: str = "markdown",
+        stream: bool = False,
     ) -> str:
         """
         Conduct research on a topic and generate a report.
@@ -47,6 +52,7 @@ Use markdown formatting for structure."""
             depth: Research depth (quick=1 pass, standard=2 passes, deep=3 passes)
             focus_areas: Specific areas to focus on
             output_format: Output format (markdown, json)
+            stream: Print the outline and final report to stdout as they generate
         
         Returns:
             Research report as string
@@ -54,13 +60,13 @@ Use markdown formatting for structure."""
         self.logger.info(f"Researching: {topic}")
         
         # Phase 1: Initial research outline
-        outline = self._create_outline(topic, focus_areas)
+        outline = self._create_outline(topic, focus_areas, stream)
         
         # Phase 2: Deep dive on each section
         sections = self._research_sections(topic, outline, depth)
         
         # Phase 3: Synthesize findings
-        report = self._synthesize_report(topic, sections)
+        report = self._synthesize_report(topic, sections, stream)
         
         # Save output
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -70,7 +76,24 @@ Use markdown formatting for structure."""
         
         return report
     
-    def _create_outline(self, topic: str, focus_areas: list[str] | None) -> str:
+    def _ask(self, prompt: str, stream: bool) -> str:
+        """Ask, echoing the response to stdout while it streams if requested."""
+        if not stream:
+            return self.ask(prompt)
+        
+        parts = []
+        for chunk in self.ask_stream(prompt):
+            print(chunk, end="", flush=True)
+            parts.append(chunk)
+        print()
+        return "".join(parts)
+    
+    def _create_outline(
+        self,
+        topic: str,
+        focus_areas: list[str] | None,
+        stream: bool = False,
+    ) -> str:
         """Create research outline."""
         focus = f"\nFocus areas: {', '.join(focus_areas)}" if focus_areas else ""
         
@@ -83,24 +106,56 @@ Return a structured outline with 4-6 main sections. For each section include:
 
 Format as markdown with ## headers."""
         
-        return self.ask(prompt)
+        return self._ask(prompt, stream)
     
     def _research_sections(self, topic: str, outline: str, depth: str) -> list[str]:
         """Research each section of the outline."""
         iterations = {"quick": 1, "standard": 2, "deep": 3}.get(depth, 2)
         
+        # Sections are independent within a pass, so each gets its own request.
+        # They run concurrently, so they are not streamed (output would interleave).
+        outline_sections = self._split_outline(outline)
+        findings: list[str | None] = [None] * len(outline_sections)
+        
         sections = []
         for i in range(iterations):
-            self.logger.info(f"Research pass {i + 1}/{iterations}")
-            
-            prompt = f"""Topic: {topic}
+            self.logger.info(
+                f"Research pass {i + 1}/{iterations} ({len(outline_sections)} sections)"
+            )
+            findings = asyncio.run(self.gather_bounded(*(
+                self.ask_async(self._section_prompt(topic, outline, section, previous))
+                for section, previous in zip(outline_sections, findings)
+            )))
+            sections.append("\n\n".join(findings))
+        
+        return sections
+    
+    def _split_outline(self, outline: str) -> list[str]:
+        """Split the outline into its ``## `` sections."""
+        parts = SECTION_RE.split(outline)[1:]
+        if not parts:
+            return [outline]
+        return [f"## {part.strip()}" for part in parts]
+    
+    def _section_prompt(
+        self,
+        topic: str,
+        outline: str,
+        section: str,
+        previous: str | None,
+    ) -> str:
+        """Build the research prompt for one outline section."""
+        return f"""Topic: {topic}
 
 Outline:
 {outline}
 
-{"Previous findings:" + chr(10) + chr(10).join(sections) if sections else ""}
+Section to research:
+{section}
+
+{"Previous findings for this section:" + chr(10) + previous if previous else ""}
 
-Provide detailed research findings for each section in the outline.
+Provide detailed research findings for this section of the outline.
 Include:
 - Key facts and data
 - Current trends
@@ -109,13 +164,8 @@ Include:
 - Opportunities
 
 Be specific and evidence-based. Use markdown formatting."""
-            
-            section = self.ask(prompt)
-            sections.append(section)
-        
-        return sections
     
-    def _synthesize_report(self, topic: str, sections: list[str]) -> str:
+    def _synthesize_report(self, topic: str, sections: list[str], stream: bool = False) -> str:
         """Synthesize all findings into final report."""
         all_research = "\n\n---\n\n".join(sections)
         
@@ -133,7 +183,7 @@ Create a final report with:
 
 Make it actionable and well-structured. Use markdown formatting."""
         
-        return self.ask(prompt)
+        return self._ask(prompt, stream)
 
 
 def main():
@@ -145,6 +195,7 @@ def main():
     parser.add_argument("--output", "-o", default="output", help="Output directory")
     parser.add_argument("--verbose", "-v", action="store_true")
     parser.add_argument("--provider", "-p", choices=["groq", "anthropic", "openai"], default="groq")
+    parser.add_argument("--stream", "-s", action="store_true", help="Stream output as it is generated")
     
     args = parser.parse_args()
     
@@ -159,10 +210,12 @@ def main():
         topic=args.topic,
         depth=args.depth,
         focus_areas=args.focus,
+        stream=args.stream,
     )
     
-    print(f"\n{'='*60}\nRESEARCH REPORT\n{'='*60}\n")
-    print(report)
+    if not args.stream:
+        print(f"\n{'='*60}\nRESEARCH REPORT\n{'='*60}\n")
+        print(report)
 
 
 if __name__ == "__main__":
@@ -11,17 +11,39 @@ Features:
 - Output aggregation
 """
 import argparse
+import io
+import re
+import sys
+import threading
+import time
 import yaml
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from core import BaseAgent, AgentConfig
+from core.config import YamlLoader
+from .conditions import evaluate_condition
+
+STEP_REF_RE = re.compile(r"\{\{steps\.([^{}]+?)\}\}")
+CONDITION_STEP_RE = re.compile(r"\bsteps\.(\w+)")
+TEMPLATE_RE = re.compile(r"\{\{((?:variables|steps)\.[^{}]+?|last_output)\}\}|\$\{([^{}]+?)\}")
 
 
 class WorkflowAgent(BaseAgent):
     """Agent that executes multi-step workflows defined in YAML."""
     
+    # Prompt-step responses kept in memory (with caching enabled)
+    PROMPT_MEMO_SIZE = 256
+    
+    def __init__(self, config: AgentConfig | None = None):
+        super().__init__(config)
+        # Responses to assembled prompt steps, LRU; repeats skip rate limiting and cache I/O
+        self._prompt_memo: OrderedDict[tuple, str] = OrderedDict()
+        self._memo_lock = threading.Lock()
+    
     @property
     def system_prompt(self) -> str:
         return """You are an intelligent workflow executor. Your job is to:
@@ -38,6 +60,8 @@ Format outputs clearly and concisely."""
         self,
         workflow: str | Path | dict,
         variables: dict[str, Any] | None = None,
+        stream: bool = False,
+        speculative: bool = False,
     ) -> dict[str, Any]:
         """
         Execute a workflow.
@@ -45,6 +69,9 @@ Format outputs clearly and concisely."""
         Args:
             workflow: Path to YAML file, YAML string, or workflow dict
             variables: Variables to inject into workflow
+            stream: Print step outputs to stdout as they generate
+            speculative: Start conditional steps while their conditions are
+                evaluated, discarding those whose condition fails
         
         Returns:
             Workflow execution results
@@ -63,121 +90,299 @@ Format outputs clearly and concisely."""
             "outputs": [],
         }
         
-        # Execute steps
+        # Execute steps, independent ones concurrently. Results are
+        # committed here between layers, so workers only read the context.
         steps = wf.get("steps", [])
-        for i, step in enumerate(steps):
-            step_name = step.get("name", f"step_{i}")
-            self.logger.info(f"Executing: {step_name}")
-            
-            # Check condition
-            if not self._check_condition(step, context):
-                self.logger.info(f"Skipping {step_name}: condition not met")
-                continue
-            
-            # Execute step
-            try:
-                result = self._execute_step(step, context)
-                context["steps"][step_name] = {
-                    "status": "success",
-                    "output": result
-                }
-                context["outputs"].append(result)
-            except Exception as e:
-                self.logger.error(f"Step {step_name} failed: {e}")
-                context["steps"][step_name] = {
-                    "status": "error",
-                    "error": str(e)
-                }
-                if step.get("on_error") == "stop":
+        names = [step.get("name", f"step_{i}") for i, step in enumerate(steps)]
+        order = {name: i for i, name in enumerate(names)}
+        outputs: dict[int, str] = {}
+        run_step = self._run_step
+        steps_ctx = context["steps"]
+        outputs_ctx = context["outputs"]
+        succeeded = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, self.config.max_concurrency)) as pool:
+            for layer in self._plan_layers(steps, names):
+                layer_steps = [steps[i] for i in layer]
+                guessing = speculative and any(step.get("condition") for step in layer_steps)
+                # Concurrent or speculative steps are not streamed; they are
+                # printed whole, in declaration order, once the layer is done
+                echo = stream and len(layer) == 1 and not guessing
+                if guessing:
+                    futures = [pool.submit(run_step, steps[i], names[i], context, echo) for i in layer]
+                    met = self._check_conditions(layer_steps, context)
+                    results = []
+                    for future, ok in zip(futures, met):
+                        if not ok:
+                            future.cancel()  # discarded if it already started
+                        results.append(future.result() if ok else None)
+                else:
+                    met = self._check_conditions(layer_steps, context)
+                    results = list(pool.map(
+                        lambda i, ok: run_step(steps[i], names[i], context, echo) if ok else None,
+                        layer, met,
+                    ))
+                for i, ok in zip(layer, met):
+                    if not ok:
+                        self.logger.info(f"Skipping {names[i]}: condition not met")
+                stop = False
+                for i, entry in zip(layer, results):
+                    if entry is None:
+                        continue
+                    steps_ctx[names[i]] = entry
+                    if entry["status"] == "success":
+                        outputs[i] = entry["output"]
+                        succeeded += 1
+                        if stream and not echo:
+                            print(f"\n## {names[i]}\n\n{entry['output']}")
+                    else:
+                        failed += 1
+                        stop = stop or steps[i].get("on_error") == "stop"
+                
+                # Keep declaration order, as a sequential run would
+                ordered = sorted(steps_ctx.items(), key=lambda kv: order[kv[0]])
+                steps_ctx.clear()
+                steps_ctx.update(ordered)
+                outputs_ctx[:] = [outputs[i] for i in sorted(outputs)]
+                if stop:
                     break
         
         # Generate summary
         summary = self._create_summary(wf, context)
         
         # Save output
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         wf_name = wf.get("name", "workflow").replace(" ", "_")
         filename = f"workflow_{wf_name}_{timestamp}.md"
         self.save_output(summary, filename)
         
         return {
             "name": wf.get("name"),
-            "steps_executed": len([s for s in context["steps"].values() if s["status"] == "success"]),
-            "steps_failed": len([s for s in context["steps"].values() if s["status"] == "error"]),
+            "steps_executed": succeeded,
+            "steps_failed": failed,
             "summary": summary,
             "context": context,
         }
     
+    def _run_step(
+        self,
+        step: dict,
+        step_name: str,
+        context: dict,
+        stream: bool = False,
+    ) -> dict:
+        """Execute a step and record its status."""
+        self.logger.info(f"Executing: {step_name}")
+        if stream:
+            print(f"\n## {step_name}\n")
+        try:
+            return {
+                "status": "success",
+                "output": self._execute_step(step, context, stream)
+            }
+        except Exception as e:
+            self.logger.error(f"Step {step_name} failed: {e}")
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+    
+    def _plan_layers(self, steps: list[dict], names: list[str]) -> list[list[int]]:
+        """Group step indices into layers whose steps can run concurrently.
+        
+        A step runs after the earlier steps it references. Steps that read
+        the whole run so far (``{{last_output}}``, transforms without
+        ``input``, aggregates without ``inputs``) run alone after everything
+        before them; conditional steps too, except that consecutive ones
+        that do not reference each other share a layer so their conditions
+        are checked in one batch. Steps after an ``on_error: stop`` step
+        wait for it.
+        """
+        layers: list[list[int]] = []
+        depth: dict[str, int] = {}
+        start = 0  # earliest layer the next step may join
+        cond_layer = None  # open layer of consecutive conditional steps
+        for i, step in enumerate(steps):
+            deps = self._step_deps(step)
+            conditional = bool(step.get("condition")) and not self._reads_all(step)
+            if conditional and cond_layer is not None and not any(
+                names[j] in deps for j in layers[cond_layer]
+            ):
+                level = cond_layer
+            elif self._is_barrier(step):
+                level = len(layers)
+            else:
+                level = max([start] + [depth[d] + 1 for d in deps if d in depth])
+                if step.get("on_error") == "stop":
+                    level = max(level, len(layers) - 1)
+            if level == len(layers):
+                layers.append([])
+            layers[level].append(i)
+            depth[names[i]] = level
+            if self._is_barrier(step) or step.get("on_error") == "stop":
+                start = level + 1
+            cond_layer = level if conditional and step.get("on_error") != "stop" else None
+        return layers
+    
+    def _step_deps(self, step: dict) -> set[str]:
+        """Names of the steps a step reads."""
+        deps = set(STEP_REF_RE.findall(step.get("prompt", "")))
+        deps.update(STEP_REF_RE.findall(step.get("transform", "")))
+        deps.update(CONDITION_STEP_RE.findall(str(step.get("condition", ""))))
+        if step.get("input"):
+            deps.add(step["input"])
+        deps.update(step.get("inputs", []))
+        return deps
+    
+    def _is_barrier(self, step: dict) -> bool:
+        """Whether a step depends on every step before it."""
+        return bool(step.get("condition")) or self._reads_all(step)
+    
+    def _reads_all(self, step: dict) -> bool:
+        """Whether a step's input is the run's outputs so far."""
+        step_type = step.get("type", "prompt")
+        return (
+            "{{last_output}}" in step.get("prompt", "")
+            or (step_type == "transform" and not step.get("input"))
+            or (step_type == "aggregate" and not step.get("inputs"))
+        )
+    
     def _load_workflow(self, workflow: str | Path | dict) -> dict | None:
         """Load workflow from various sources."""
         if isinstance(workflow, dict):
             return workflow
         
-        if isinstance(workflow, Path) or (isinstance(workflow, str) and Path(workflow).exists()):
-            path = Path(workflow)
-            with open(path) as f:
-                return yaml.safe_load(f)
+        # Bundled templates are parsed once at import
+        if isinstance(workflow, str) and workflow in _EXAMPLE_WORKFLOWS_BY_SOURCE:
+            return _EXAMPLE_WORKFLOWS_BY_SOURCE[workflow]
+        
+        # Multi-line strings are YAML source, never paths (and may be too long to stat)
+        if isinstance(workflow, Path) or (
+            isinstance(workflow, str) and "\n" not in workflow and Path(workflow).exists()
+        ):
+            path = Path(workflow).resolve()
+            return _parse_yaml_file(str(path), path.stat().st_mtime)
         
         if isinstance(workflow, str):
             try:
-                return yaml.safe_load(workflow)
+                return yaml.load(workflow, Loader=YamlLoader)
             except:
                 return None
         
         return None
     
-    def _check_condition(self, step: dict, context: dict) -> bool:
-        """Check if step condition is met."""
-        condition = step.get("condition")
-        if not condition:
-            return True
+    def _check_conditions(self, steps: list[dict], context: dict) -> list[bool]:
+        """Check the conditions of steps, asking about the undecided ones in one batch."""
+        met = [True] * len(steps)
+        pending = []
+        for i, step in enumerate(steps):
+            if not step.get("condition"):
+                continue
+            # Simple expressions are decided locally, without a round-trip
+            local = evaluate_condition(step["condition"], context)
+            if local is None:
+                pending.append(i)
+            else:
+                met[i] = local
+        if not pending:
+            return met
         
-        # Simple condition evaluation
-        prompt = f"""Evaluate this condition and return ONLY 'true' or 'false':
+        # Natural-language condition evaluation
+        prompts = [
+            f"""Evaluate this condition and return ONLY 'true' or 'false':
 
-Condition: {condition}
+Condition: {steps[i]["condition"]}
 
 Context:
 - Variables: {context['variables']}
 - Previous step results: {list(context['steps'].keys())}
 
 Return only 'true' or 'false', nothing else."""
-        
-        result = self.ask(prompt).strip().lower()
-        return result == "true"
+            for i in pending
+        ]
+        for i, result in zip(pending, self.ask_many(prompts)):
+            met[i] = result.strip().lower() == "true"
+        return met
     
-    def _execute_step(self, step: dict, context: dict) -> str:
+    def _execute_step(self, step: dict, context: dict, stream: bool = False) -> str:
         """Execute a single workflow step."""
         step_type = step.get("type", "prompt")
         
         if step_type == "prompt":
-            return self._execute_prompt(step, context)
+            return self._execute_prompt(step, context, stream)
         elif step_type == "transform":
-            return self._execute_transform(step, context)
+            return self._execute_transform(step, context, stream)
         elif step_type == "aggregate":
-            return self._execute_aggregate(step, context)
+            return self._execute_aggregate(step, context, stream)
         else:
             raise ValueError(f"Unknown step type: {step_type}")
     
-    def _execute_prompt(self, step: dict, context: dict) -> str:
+    def _ask(
+        self,
+        prompt: str | list[str],
+        system: str | None = None,
+        stream: bool = False,
+    ) -> str:
+        """Ask, teeing the response to stdout while it streams if requested."""
+        if not stream:
+            return self.ask(prompt, system=system)
+        
+        buffer = io.StringIO()
+        for chunk in self.ask(prompt, system=system, stream=True):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+            buffer.write(chunk)
+        print()
+        return buffer.getvalue()
+    
+    def _execute_prompt(self, step: dict, context: dict, stream: bool = False) -> str:
         """Execute a prompt step."""
         prompt_template = step.get("prompt", "")
         
+        # Earlier outputs the step reads lead as their own blocks, a prefix
+        # cacheable across the steps that read them; the step text points
+        # to them instead of repeating them
+        steps_ctx = context["steps"]
+        refs = [
+            name for name in dict.fromkeys(STEP_REF_RE.findall(prompt_template))
+            if steps_ctx.get(name, {}).get("status") == "success"
+        ]
+        if refs:
+            prompt_template = STEP_REF_RE.sub(
+                lambda m: f'[output of step "{m.group(1)}" above]' if m.group(1) in refs else m.group(0),
+                prompt_template,
+            )
+        
         # Inject context
         prompt = self._inject_context(prompt_template, context)
+        if refs:
+            prompt = [
+                *(f'Output of step "{name}":\n{steps_ctx[name]["output"]}' for name in refs),
+                prompt,
+            ]
         
         # Get custom system prompt if specified
         system = step.get("system")
-        if system:
-            # Temporarily override system prompt
-            original_system = self.system_prompt
-            result = self.ask(prompt, system=system)
-        else:
-            result = self.ask(prompt)
+        if not self.config.cache_enabled:
+            return self._ask(prompt, system=system, stream=stream)
+        
+        memo_key = (tuple(prompt) if isinstance(prompt, list) else prompt, system or "")
+        with self._memo_lock:
+            result = self._prompt_memo.get(memo_key)
+            if result is not None:
+                self._prompt_memo.move_to_end(memo_key)
+        if result is not None:
+            if stream:
+                print(result)
+            return result
         
+        result = self._ask(prompt, system=system, stream=stream)
+        with self._memo_lock:
+            self._prompt_memo[memo_key] = result
+            if len(self._prompt_memo) > self.PROMPT_MEMO_SIZE:
+                self._prompt_memo.popitem(last=False)
         return result
     
-    def _execute_transform(self, step: dict, context: dict) -> str:
+    def _execute_transform(self, step: dict, context: dict, stream: bool = False) -> str:
         """Transform previous output."""
         transform = step.get("transform", "")
         input_step = step.get("input")
@@ -196,73 +401,74 @@ Transformation: {transform}
 
 Apply the transformation and return the result."""
         
-        return self.ask(prompt)
+        return self._ask(prompt, stream=stream)
     
-    def _execute_aggregate(self, step: dict, context: dict) -> str:
+    def _execute_aggregate(self, step: dict, context: dict, stream: bool = False) -> str:
         """Aggregate multiple outputs."""
         inputs = step.get("inputs", [])
         format_spec = step.get("format", "bullet_points")
         
         # Collect inputs
-        data = []
-        for inp in inputs:
-            if inp in context["steps"]:
-                data.append(f"## {inp}\n{context['steps'][inp].get('output', '')}")
+        steps_ctx = context["steps"]
+        data = [f"## {inp}\n{steps_ctx[inp].get('output', '')}" for inp in inputs if inp in steps_ctx]
         
         if not data:
             data = [f"## Output {i+1}\n{out}" for i, out in enumerate(context["outputs"])]
         
-        prompt = f"""Aggregate and format these outputs:
-
-{chr(10).join(data)}
-
-Format: {format_spec}
-
-Create a cohesive summary that combines all the information."""
+        prompt = "".join((
+            "Aggregate and format these outputs:\n\n",
+            "\n".join(data),
+            f"\n\nFormat: {format_spec}\n\n",
+            "Create a cohesive summary that combines all the information.",
+        ))
         
-        return self.ask(prompt)
+        return self._ask(prompt, stream=stream)
     
     def _inject_context(self, template: str, context: dict) -> str:
         """Inject context variables into template."""
-        result = template
-        
-        # Inject variables
-        for key, value in context["variables"].items():
-            result = result.replace(f"{{{{variables.{key}}}}}", str(value))
-            result = result.replace(f"${{{key}}}", str(value))
-        
-        # Inject previous outputs
-        for step_name, step_data in context["steps"].items():
-            if step_data["status"] == "success":
-                result = result.replace(f"{{{{steps.{step_name}}}}}", step_data["output"])
-        
-        # Inject last output
+        # Variables, previous outputs and the last output, by placeholder
+        lookup = {f"variables.{key}": str(value) for key, value in context["variables"].items()}
+        lookup.update(
+            (f"steps.{step_name}", step_data["output"])
+            for step_name, step_data in context["steps"].items()
+            if step_data["status"] == "success"
+        )
         if context["outputs"]:
-            result = result.replace("{{last_output}}", context["outputs"][-1])
+            lookup["last_output"] = context["outputs"][-1]
         
-        return result
+        # One pass; unknown placeholders are left as written
+        return TEMPLATE_RE.sub(
+            lambda m: lookup.get(m.group(1) or f"variables.{m.group(2)}", m.group(0)),
+            template,
+        )
     
     def _create_summary(self, workflow: dict, context: dict) -> str:
         """Create workflow execution summary."""
-        steps_summary = []
+        parts = [
+            "# Workflow Execution Report\n\n",
+            f"**Workflow**: {workflow.get('name', 'Unnamed')}\n",
+            f"**Description**: {workflow.get('description', 'N/A')}\n",
+            f"**Executed**: {time.strftime('%Y-%m-%d %H:%M')}\n\n",
+            "## Execution Summary\n\n",
+        ]
         for name, data in context["steps"].items():
             status = "✓" if data["status"] == "success" else "✗"
-            steps_summary.append(f"- {status} {name}")
+            parts.append(f"- {status} {name}\n")
         
-        return f"""# Workflow Execution Report
-
-**Workflow**: {workflow.get('name', 'Unnamed')}
-**Description**: {workflow.get('description', 'N/A')}
-**Executed**: {datetime.now().strftime("%Y-%m-%d %H:%M")}
-
-## Execution Summary
-
-{chr(10).join(steps_summary)}
+        parts.append("\n## Outputs\n\n")
+        separator = ""
+        for name, data in context["steps"].items():
+            if data["status"] == "success":
+                parts.append(f"{separator}### {name}\n{_truncate(data.get('output', 'No output'), 500)}")
+                separator = "---"
+        parts.append("\n")
+        
+        return "".join(parts)
 
-## Outputs
 
-{"---".join([f"### {name}{chr(10)}{data.get('output', 'No output')[:500]}" for name, data in context["steps"].items() if data["status"] == "success"])}
-"""
+def _truncate(text: str, limit: int) -> str:
+    """First ``limit`` characters of text, without copying shorter strings."""
+    return text if len(text) <= limit else text[:limit]
 
 
 # Example workflow templates
@@ -337,6 +543,20 @@ steps:
 """,
 }
 
+_EXAMPLE_WORKFLOWS_PARSED: dict[str, dict] = {
+    name: yaml.load(source, Loader=YamlLoader) for name, source in EXAMPLE_WORKFLOWS.items()
+}
+_EXAMPLE_WORKFLOWS_BY_SOURCE: dict[str, dict] = {
+    EXAMPLE_WORKFLOWS[name]: parsed for name, parsed in _EXAMPLE_WORKFLOWS_PARSED.items()
+}
+
+
+@lru_cache(maxsize=32)
+def _parse_yaml_file(path: str, mtime: float) -> Any:
+    """Parse a workflow file; ``mtime`` is part of the key so edits are re-read."""
+    with open(path) as f:
+        return yaml.load(f, Loader=YamlLoader)
+
 
 def main():
     """CLI entry point."""
@@ -348,6 +568,7 @@ def main():
     parser.add_argument("--verbose", action="store_true")
     parser.add_argument("--list-templates", action="store_true", help="List example templates")
     parser.add_argument("--provider", choices=["groq", "anthropic", "openai"], default="groq")
+    parser.add_argument("--stream", "-s", action="store_true", help="Stream step outputs as they generate")
     
     args = parser.parse_args()
     
@@ -358,8 +579,8 @@ def main():
         return
     
     # Load workflow
-    if args.workflow in EXAMPLE_WORKFLOWS:
-        workflow = EXAMPLE_WORKFLOWS[args.workflow]
+    if args.workflow in _EXAMPLE_WORKFLOWS_PARSED:
+        workflow = _EXAMPLE_WORKFLOWS_PARSED[args.workflow]
     else:
         workflow = args.workflow
     
@@ -376,12 +597,13 @@ def main():
     )
     
     agent = WorkflowAgent(config)
-    result = agent.run(workflow=workflow, variables=variables)
+    result = agent.run(workflow=workflow, variables=variables, stream=args.stream)
     
     print(f"\nWorkflow completed:")
     print(f"  Steps executed: {result['steps_executed']}")
     print(f"  Steps failed: {result['steps_failed']}")
-    print(f"\n{result['summary']}")
+    if not args.stream:
+        print(f"\n{result['summary']}")
 
 
 if __name__ == "__main__":
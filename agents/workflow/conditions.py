@@ -0,0 +1,166 @@
+"""Local evaluation of simple step conditions.
+
+Conditions such as ``variables.publish == true`` or
+``steps.research.status == success`` are decided here without an LLM call.
+Only a small expression subset is accepted (comparisons, and/or/not,
+literals and ``variables.*`` / ``steps.*`` lookups); anything else is
+reported as undecidable and left to the LLM.
+"""
+import ast
+import operator
+from functools import lru_cache
+from typing import Any
+
+_COMPARE = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_ALLOWED = (
+    ast.Expression, ast.Compare, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not,
+    ast.Name, ast.Constant, ast.Attribute, ast.Load, *_COMPARE,
+)
+
+_WORDS = {"true": True, "false": False, "none": None, "null": None}
+_TRUTHY = {"true", "yes", "on", "1"}
+_FALSY = {"false", "no", "off", "0", ""}
+
+
+class Undecidable(Exception):
+    """The condition is not a simple expression over the context."""
+
+
+@lru_cache(maxsize=256)
+def _parse(condition: str) -> ast.Expression | None:
+    """Parsed condition, or None if it is outside the accepted subset."""
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+    except SyntaxError:
+        return None
+    if not all(isinstance(node, _ALLOWED) for node in ast.walk(tree)):
+        return None
+    return tree
+
+
+def evaluate_condition(condition: Any, context: dict) -> bool | None:
+    """Decide a condition locally; None if it needs the LLM.
+
+    Non-string YAML values (``condition: true``) are read as their text.
+    """
+    tree = _parse(str(condition))
+    if tree is None:
+        return None
+    try:
+        return bool(_eval(tree.body, context))
+    except Undecidable:
+        return None
+
+
+def _eval(node: ast.AST, context: dict, operand: bool = False) -> Any:
+    """Evaluate a node; bare words are string literals only when compared to a lookup."""
+    if isinstance(node, ast.BoolOp):
+        values = (_eval(value, context) for value in node.values)
+        return all(values) if isinstance(node.op, ast.And) else any(values)
+    if isinstance(node, ast.UnaryOp):
+        return not _eval(node.operand, context)
+    if isinstance(node, ast.Compare):
+        operands = [node.left, *node.comparators]
+        for a, b in zip(operands, operands[1:]):
+            # "status == success" is a word literal only against a lookup
+            if (_is_word(a) and not isinstance(b, ast.Attribute)) or (
+                _is_word(b) and not isinstance(a, ast.Attribute)
+            ):
+                raise Undecidable
+        left = _eval(node.left, context, operand=True)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _eval(comparator, context, operand=True)
+            try:
+                if not _COMPARE[type(op)](*_coerce(left, right)):
+                    return False
+            except TypeError:
+                raise Undecidable from None
+            left = right
+        return True
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        word = node.id.lower()
+        if word in _WORDS:
+            return _WORDS[word]
+        if operand:
+            return node.id
+        raise Undecidable
+    if isinstance(node, ast.Attribute):
+        return _lookup(node, context, operand)
+    raise Undecidable
+
+
+def _is_word(node: ast.AST) -> bool:
+    """Whether a node is a bare word such as ``success``."""
+    return isinstance(node, ast.Name) and node.id.lower() not in _WORDS
+
+
+def _lookup(node: ast.Attribute, context: dict, operand: bool = False) -> Any:
+    """Resolve ``variables.name[.key...]`` or ``steps.name[.status|.output|.error]``.
+
+    A bare ``steps.name`` is its status when compared, else whether it
+    succeeded. A string variable used as a truth value must read as a
+    boolean word (true/false, yes/no, ...), otherwise it is undecidable.
+    """
+    path = []
+    while isinstance(node, ast.Attribute):
+        path.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name) or node.id not in ("variables", "steps"):
+        raise Undecidable
+    path.reverse()
+
+    if node.id == "steps":
+        step = context["steps"].get(path[0])
+        if len(path) == 1:
+            if not operand:
+                return bool(step) and step["status"] == "success"
+            return step["status"] if step else None
+        if len(path) > 2 or path[1] not in ("status", "output", "error"):
+            raise Undecidable
+        return step.get(path[1]) if step else None
+
+    value: Any = context["variables"]
+    for key in path:
+        if not isinstance(value, dict):
+            raise Undecidable
+        value = value.get(key)
+    if isinstance(value, str) and not operand:
+        # Used as a truth value: "false" from the CLI must not count as set
+        word = value.strip().lower()
+        if word in _TRUTHY:
+            return True
+        if word in _FALSY:
+            return False
+        raise Undecidable
+    return value
+
+
+def _coerce(a: Any, b: Any) -> tuple[Any, Any]:
+    """Compare strings (e.g. CLI variables) against bools and numbers by value."""
+    if isinstance(a, str) and isinstance(b, (bool, int, float)):
+        return _from_str(a, b), b
+    if isinstance(b, str) and isinstance(a, (bool, int, float)):
+        return a, _from_str(b, a)
+    return a, b
+
+
+def _from_str(text: str, like: Any) -> Any:
+    """Convert text to the type of ``like``, leaving it as is if it does not parse."""
+    if isinstance(like, bool):
+        return text.strip().lower() in _TRUTHY
+    try:
+        return float(text)
+    except ValueError:
+        return text
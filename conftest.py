@@ -0,0 +1 @@
+"""Pytest root: having a conftest here puts the repo root on sys.path, so tests import ``core`` and ``agents`` directly."""
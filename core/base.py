@@ -1,12 +1,18 @@
 """Base agent class with common functionality."""
+import asyncio
 import time
 import logging
+import threading
+from collections import deque
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable, Generator, TypeVar
 
+from .cache import ResponseCache
 from .config import AgentConfig
-from .llm import LLMProvider, Message, LLMResponse
+from .llm import CompletionRequest, LLMProvider, Message, LLMResponse
+
+T = TypeVar("T")
 
 
 class BaseAgent(ABC):
@@ -19,12 +25,26 @@ class BaseAgent(ABC):
             model=self.config.model,
             cache_dir=self.config.cache_dir if self.config.cache_enabled else None,
             cache_ttl=self.config.cache_ttl,
+            similarity_threshold=(
+                self.config.completion_similarity if self.config.semantic_cache else None
+            ),
+        )
+        self.response_cache = (
+            ResponseCache(
+                Path(self.config.cache_dir) / "responses.db",
+                similarity_threshold=(
+                    self.config.semantic_threshold if self.config.semantic_cache else None
+                ),
+                ttl=self.config.cache_ttl,
+            )
+            if self.config.cache_enabled else None
         )
         self.logger = logging.getLogger(self.__class__.__name__)
         self._setup_logging()
         
         # Rate limiting
-        self._request_times: list[float] = []
+        self._request_times: deque[float] = deque()
+        self._rate_lock = threading.Lock()
         
         # Output directory
         self.output_dir = Path(self.config.output_dir)
@@ -39,18 +59,41 @@ class BaseAgent(ABC):
         )
     
     def _rate_limit(self) -> None:
-        """Enforce rate limiting."""
-        now = time.time()
-        # Remove requests older than 1 minute
-        self._request_times = [t for t in self._request_times if now - t < 60]
-        
-        if len(self._request_times) >= self.config.requests_per_minute:
-            sleep_time = 60 - (now - self._request_times[0])
-            if sleep_time > 0:
-                self.logger.debug(f"Rate limited, sleeping {sleep_time:.1f}s")
-                time.sleep(sleep_time)
-        
-        self._request_times.append(time.time())
+        """Enforce rate limiting (safe to call from worker threads)."""
+        with self._rate_lock:
+            clock = time.time
+            now = clock()
+            # Remove requests older than 1 minute
+            req_times = self._request_times
+            while req_times and now - req_times[0] >= 60:
+                req_times.popleft()
+            
+            if len(req_times) >= self.config.requests_per_minute:
+                sleep_time = 60 - (now - req_times[0])
+                if sleep_time > 0:
+                    self.logger.debug(f"Rate limited, sleeping {sleep_time:.1f}s")
+                    time.sleep(sleep_time)
+            
+            req_times.append(clock())
+    
+    def _log_usage(self, response: LLMResponse) -> None:
+        """Log token usage and prompt-cache hit rate in verbose mode."""
+        if not self.config.verbose:
+            return
+        self.logger.debug(f"Tokens: {response.usage}")
+        if response.cached:
+            self.logger.debug("(cached)")
+        read = response.usage.get("cache_read_input_tokens")
+        if read is not None:
+            total = (
+                response.usage.get("input_tokens", 0) + read
+                + response.usage.get("cache_creation_input_tokens", 0)
+            )
+            # OpenAI counts cached tokens inside input_tokens
+            if self.llm.provider != "anthropic":
+                total -= read
+            if total:
+                self.logger.debug(f"Prompt cache: {read}/{total} input tokens read ({read / total:.0%})")
     
     def _retry(self, fn: Callable, *args, **kwargs) -> Any:
         """Retry a function with exponential backoff."""
@@ -67,15 +110,27 @@ class BaseAgent(ABC):
     
     def ask(
         self,
-        prompt: str,
-        system: str | None = None,
+        prompt: str | list[str],
+        system: str | list[str] | None = None,
         context: list[Message] | None = None,
-    ) -> str:
-        """Send a prompt to the LLM and get a response."""
+        stream: bool = False,
+        cache: bool = True,
+    ) -> str | Generator[str, None, str]:
+        """Send a prompt to the LLM and get a response.
+
+        ``system`` and ``prompt`` may be lists of blocks; keep static text in
+        the leading blocks and the variable payload last so the prefix stays
+        cacheable. With ``stream`` this returns the ask_stream generator.
+        ``cache=False`` skips the LLM response cache.
+        """
+        if stream:
+            return self.ask_stream(prompt, system, context)
+        
         self._rate_limit()
         
-        messages = context or []
-        messages.append(Message(role="user", content=prompt))
+        # Build a new list; the caller's context must not grow a user turn
+        messages = [*(context or []), Message(role="user", content=prompt)]
+        context_len = len(context) if context is not None else 0
         
         response = self._retry(
             self.llm.complete,
@@ -83,15 +138,127 @@ class BaseAgent(ABC):
             system=system or self.system_prompt,
             max_tokens=self.config.max_tokens,
             temperature=self.config.temperature,
+            cache=cache,
+        )
+        assert context is None or len(context) == context_len, "ask() mutated its context"
+        
+        self._log_usage(response)
+        return response.content
+    
+    def ask_many(
+        self,
+        prompts: list[str | list[str]],
+        system: str | list[str] | None = None,
+    ) -> list[str]:
+        """Send independent prompts concurrently and return their responses in order.
+        
+        A failure retries the whole batch; responses that already arrived
+        come back from the LLM cache.
+        """
+        for _ in prompts:
+            self._rate_limit()
+        
+        requests = [
+            CompletionRequest(
+                messages=[Message(role="user", content=prompt)],
+                system=system or self.system_prompt,
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature,
+            )
+            for prompt in prompts
+        ]
+        responses = self._retry(
+            self.llm.complete_many, requests, max_workers=self.config.max_concurrency
         )
+        for response in responses:
+            self._log_usage(response)
+        return [response.content for response in responses]
+    
+    def ask_stream(
+        self,
+        prompt: str | list[str],
+        system: str | list[str] | None = None,
+        context: list[Message] | None = None,
+    ) -> Generator[str, None, str]:
+        """Like ask, but yields the response in chunks as it is generated.
+        
+        Returns the full response text. Failures before the first chunk
+        are retried like ask; a stream that breaks midway raises.
+        """
+        self._rate_limit()
+        
+        messages = [*(context or []), Message(role="user", content=prompt)]
         
-        if self.config.verbose:
-            self.logger.debug(f"Tokens: {response.usage}")
-            if response.cached:
-                self.logger.debug("(cached)")
+        def start() -> tuple[Generator[str, None, LLMResponse] | None, str]:
+            stream = self.llm.stream_complete(
+                messages=messages,
+                system=system or self.system_prompt,
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature,
+            )
+            try:
+                return stream, next(stream)
+            except StopIteration as done:
+                return None, done.value.content
         
+        stream, first = self._retry(start)
+        if first:
+            yield first
+        if stream is None:
+            return first
+        
+        response = yield from stream
+        self._log_usage(response)
         return response.content
     
+    def ask_cached(
+        self,
+        prompt: str,
+        key: str,
+        system: str | list[str] | None = None,
+        similar: str | None = None,
+        namespace: str = "",
+    ) -> str:
+        """ask() behind the persistent response cache.
+        
+        ``key`` identifies the request exactly (see ``core.cache.cache_key``).
+        Passing ``similar`` also allows a semantic hit on that text among
+        entries stored under the same ``namespace``.
+        """
+        cache = self.response_cache
+        if cache:
+            hit = cache.get(key)
+            if hit is None and similar is not None:
+                hit = cache.find_similar(similar, namespace)
+            if hit is not None:
+                self.logger.debug("(response cache hit)")
+                return hit
+        
+        # The response cache holds the result, so the LLM cache need not
+        response = self.ask(prompt, system=system, cache=cache is None)
+        if cache:
+            cache.set(key, response, similar, namespace)
+        return response
+    
+    async def ask_async(
+        self,
+        prompt: str,
+        system: str | list[str] | None = None,
+        context: list[Message] | None = None,
+    ) -> str:
+        """Async variant of ask; runs the blocking call in a worker thread."""
+        return await asyncio.to_thread(self.ask, prompt, system, context)
+    
+    async def gather_bounded(self, *aws: Awaitable[T]) -> list[T]:
+        """Await concurrently, at most ``config.max_concurrency`` at a time."""
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        
+        async def bounded(aw: Awaitable[T]) -> T:
+            async with semaphore:
+                return await aw
+        
+        return list(await asyncio.gather(*(bounded(aw) for aw in aws)))
+    
     @property
     @abstractmethod
     def system_prompt(self) -> str:
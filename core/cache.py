@@ -0,0 +1,258 @@
+"""Persistent response cache with exact and semantic lookup."""
+import hashlib
+import importlib.util
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+HAS_FAISS = importlib.util.find_spec("faiss") is not None
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Loaded models, shared by every cache in the process
+_models: dict[str, Any] = {}
+
+
+def _compress(text: str) -> bytes:
+    """Compress a stored value (zstd if installed, else zlib)."""
+    data = text.encode()
+    if HAS_ZSTD:
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data)
+
+
+def _decompress(value: bytes) -> str | None:
+    """Inverse of _compress; None if the value's codec is unavailable."""
+    if value.startswith(_ZSTD_MAGIC):
+        if not HAS_ZSTD:
+            return None
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(value).decode()
+    return zlib.decompress(value).decode()
+
+
+def cache_key(*parts: str) -> str:
+    """Stable key for a request built from its identifying parts."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def build_index(matrix: "np.ndarray") -> Any:
+    """Inner-product index over L2-normalized rows (FAISS if installed, else the matrix)."""
+    if HAS_FAISS:
+        import faiss
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+        return index
+    return matrix
+
+
+def search_index(index: Any, vector: "np.ndarray") -> tuple[float, int]:
+    """Cosine similarity and row of the nearest neighbour of ``vector``."""
+    if HAS_FAISS:
+        scores, ids = index.search(vector[None], 1)
+        return float(scores[0][0]), int(ids[0][0])
+    scores = index @ vector
+    best = int(scores.argmax())
+    return float(scores[best]), best
+
+
+class Embedder:
+    """Sentence embeddings for semantic lookup (needs sentence-transformers)."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.available = all(
+            importlib.util.find_spec(name) is not None
+            for name in ("numpy", "sentence_transformers")
+        )
+        self._last: "tuple[str, np.ndarray] | None" = None
+
+    def encode(self, text: str) -> "np.ndarray | None":
+        """L2-normalized float32 embedding, or None if unavailable.
+
+        A model that fails to load or encode (e.g. offline with no local
+        copy) disables the embedder, so callers fall back to exact matches.
+        """
+        if not self.available:
+            return None
+        # A lookup miss is usually followed by storing the same text
+        last = self._last
+        if last is not None and last[0] == text:
+            return last[1]
+        try:
+            model = _models.get(self.model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _models[self.model_name] = SentenceTransformer(self.model_name)
+            vector = model.encode(text, normalize_embeddings=True).astype("float32")
+        except Exception as e:
+            logger.warning(f"Semantic cache disabled, embedding failed: {e}")
+            self.available = False
+            return None
+        self._last = (text, vector)
+        return vector
+
+
+class ResponseCache:
+    """SQLite-backed response cache with an optional semantic tier.
+
+    Exact hits are looked up by key. When ``similarity_threshold`` is set,
+    misses can fall back to the most similar stored text in the same
+    namespace (cosine similarity over normalized embeddings).
+
+    Entries are evicted least-recently-used once ``max_entries`` is
+    exceeded, except those hit ``promote_after`` times or more, which are
+    kept as long-term entries. With ``ttl`` (seconds) set, entries older
+    than that are ignored and pruned on open, promoted or not.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 1000,
+        promote_after: int = 3,
+        similarity_threshold: float | None = 0.87,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        ttl: float | None = None,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.promote_after = promote_after
+        self.similarity_threshold = similarity_threshold
+        self.embedder = Embedder(embedding_model) if similarity_threshold is not None else None
+
+        self._lock = threading.Lock()
+        # namespace -> (keys, index) for semantic search; rebuilt after writes
+        self._indexes: dict[str, tuple[list[str], Any]] = {}
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value BLOB NOT NULL,
+                embedding BLOB,
+                hits INTEGER NOT NULL DEFAULT 0,
+                accessed REAL NOT NULL,
+                created REAL NOT NULL
+            )"""
+        )
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (self._cutoff(),))
+
+    def _cutoff(self) -> float:
+        """Creation time before which entries are expired."""
+        return time.time() - self.ttl if self.ttl is not None else float("-inf")
+
+    @property
+    def semantic(self) -> bool:
+        """Whether semantic lookup is enabled and its dependencies installed."""
+        return self.embedder is not None and self.embedder.available
+
+    def get(self, key: str) -> str | None:
+        """Exact-match lookup."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND created >= ?",
+                (key, self._cutoff()),
+            ).fetchone()
+            if row is None:
+                return None
+            value = _decompress(row[0])
+            if value is not None:
+                self._touch(key)
+            return value
+
+    def find_similar(self, text: str, namespace: str = "") -> str | None:
+        """Return the stored value whose text is most similar to ``text``."""
+        if not self.semantic:
+            return None
+        vector = self.embedder.encode(text)
+        if vector is None:
+            return None
+        with self._lock:
+            keys, index = self._index(namespace)
+            if not keys:
+                return None
+            score, best = search_index(index, vector)
+            if score < self.similarity_threshold:
+                return None
+        return self.get(keys[best])
+
+    def _index(self, namespace: str) -> tuple[list[str], Any]:
+        """Keys and vector index of a namespace's embedded entries.
+
+        Vectors are L2-normalized, so inner product is cosine similarity.
+        """
+        if namespace in self._indexes:
+            return self._indexes[namespace]
+        import numpy as np
+
+        rows = self._db.execute(
+            "SELECT key, embedding FROM responses "
+            "WHERE namespace = ? AND embedding IS NOT NULL AND created >= ?",
+            (namespace, self._cutoff()),
+        ).fetchall()
+        keys = [key for key, _ in rows]
+        index = None
+        if rows:
+            matrix = np.frombuffer(b"".join(e for _, e in rows), dtype=np.float32)
+            index = build_index(matrix.reshape(len(rows), -1))
+        self._indexes[namespace] = (keys, index)
+        return keys, index
+
+    def set(self, key: str, value: str, text: str | None = None, namespace: str = "") -> None:
+        """Store a value; ``text`` makes it findable by ``find_similar``."""
+        embedding = None
+        if text is not None and self.semantic:
+            vector = self.embedder.encode(text)
+            if vector is not None:
+                embedding = vector.tobytes()
+        data = _compress(value)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, namespace, value, embedding, hits, accessed, created) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (key, namespace, data, embedding, now, now),
+            )
+            self._evict()
+            self._indexes.clear()
+
+    def _touch(self, key: str) -> None:
+        """Record a hit on an entry."""
+        self._db.execute(
+            "UPDATE responses SET hits = hits + 1, accessed = ? WHERE key = ?",
+            (time.time(), key),
+        )
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries that have not been promoted."""
+        (count,) = self._db.execute(
+            "SELECT COUNT(*) FROM responses WHERE hits < ?", (self.promote_after,)
+        ).fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses WHERE hits < ? ORDER BY accessed LIMIT ?)",
+                (self.promote_after, count - self.max_entries),
+            )
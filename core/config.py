@@ -5,6 +5,12 @@ from pathlib import Path
 from typing import Any
 import yaml
 
+# libyaml C bindings are much faster; fall back to pure Python without them
+try:
+    from yaml import CSafeDumper as YamlDumper, CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper, SafeLoader as YamlLoader
+
 
 @dataclass
 class AgentConfig:
@@ -20,11 +26,17 @@ class AgentConfig:
     requests_per_minute: int = 50
     retry_attempts: int = 3
     retry_delay: float = 1.0
+    max_concurrency: int = 8  # parallel LLM calls (Groq free tier tolerates ~8)
     
     # Caching
     cache_enabled: bool = True
     cache_dir: str = ".cache"
     cache_ttl: int = 3600  # seconds
+    semantic_cache: bool = True  # needs sentence-transformers
+    semantic_threshold: float = 0.87  # cosine similarity for a semantic hit
+    # Opt-in semantic hit on whole low-temperature prompts (e.g. 0.95); prompts
+    # sharing a template embed alike, so prefer ask_cached(similar=...)
+    completion_similarity: float | None = None
     
     # Output
     output_dir: str = "output"
@@ -37,7 +49,7 @@ class AgentConfig:
     def from_yaml(cls, path: str | Path) -> "AgentConfig":
         """Load config from YAML file."""
         with open(path) as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=YamlLoader)
         return cls(**data)
     
     @classmethod
@@ -54,4 +66,4 @@ class AgentConfig:
     def to_yaml(self, path: str | Path) -> None:
         """Save config to YAML file."""
         with open(path, "w") as f:
-            yaml.dump(self.__dict__, f, default_flow_style=False)
+            yaml.dump(self.__dict__, f, Dumper=YamlDumper, default_flow_style=False)
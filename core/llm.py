@@ -2,32 +2,71 @@
 import os
 import time
 import hashlib
-import json
+import importlib
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Generator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-try:
-    import anthropic
-except ImportError:
-    anthropic = None
+from .cache import ResponseCache
 
 try:
-    import openai
-except ImportError:
-    openai = None
+    import orjson
 
-try:
-    from groq import Groq
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+    _loads = orjson.loads
 except ImportError:
-    Groq = None
+    import json
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, sort_keys=True).encode()
+
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("model", "temperature", "max_tokens", "system", "messages")
+
+# Provider SDKs are heavy (httpx, pydantic); import only the one in use
+_providers: dict[str, Any] = {}
+
+
+def _sdk(name: str) -> Any:
+    """Import a provider SDK on first use."""
+    module = _providers.get(name)
+    if module is None:
+        try:
+            module = _providers[name] = importlib.import_module(name)
+        except ImportError:
+            raise ImportError(f"pip install {name}") from None
+    return module
+
+
+def __getattr__(name: str) -> Any:
+    """Lazy module attributes for the SDKs once imported at the top level.
+    
+    A missing SDK reads as None, as the old try/except imports left it.
+    """
+    try:
+        if name in ("anthropic", "openai"):
+            return _sdk(name)
+        if name == "Groq":
+            return _sdk("groq").Groq
+    except ImportError:
+        return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @dataclass
 class Message:
     """Unified message format."""
     role: str  # user, assistant, system
-    content: str
+    content: str | list[str]  # a list is one message of blocks, static ones first
 
 
 @dataclass 
@@ -39,6 +78,90 @@ class LLMResponse:
     cached: bool = False
 
 
+@dataclass
+class CompletionRequest:
+    """Arguments of one complete() call, for complete_many."""
+    messages: list[Message]
+    system: str | list[str] | None = None
+    max_tokens: int = 4096
+    temperature: float = 0.7
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+def _system_text(system: str | list[str] | None) -> str | None:
+    """Flatten system prompt blocks into a single string."""
+    if isinstance(system, list):
+        return "\n\n".join(system)
+    return system
+
+
+def _system_blocks(system: str | list[str]) -> list[dict[str, Any]]:
+    """Build Anthropic system blocks with a cache breakpoint on the last one.
+
+    The breakpoint caches the whole system prefix, so static instructions
+    passed as extra blocks are reused across calls alongside the prompt.
+    """
+    parts = [system] if isinstance(system, str) else system
+    blocks: list[dict[str, Any]] = [{"type": "text", "text": part} for part in parts]
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def _content_text(content: str | list[str]) -> str:
+    """Flatten message blocks into a single string."""
+    if isinstance(content, list):
+        return "\n\n".join(content)
+    return content
+
+
+def _canonical(content: str | list[str] | None) -> str | tuple[str, ...]:
+    """Hashable, whitespace-normalized form of a prompt for cache keys."""
+    if content is None:
+        return ""
+    if isinstance(content, list):
+        return tuple(part.strip() for part in content)
+    return content.strip()
+
+
+def _digest(key_input: tuple) -> str:
+    """Cache key for canonical request fields."""
+    return hashlib.blake2b(repr(key_input).encode(), digest_size=16).hexdigest()
+
+
+def _content_blocks(content: str | list[str]) -> str | list[dict[str, Any]]:
+    """Anthropic message content; multi-block content is cached up to its last static block."""
+    if isinstance(content, str):
+        return content
+    blocks: list[dict[str, Any]] = [{"type": "text", "text": part} for part in content]
+    if len(blocks) > 1:
+        blocks[-2]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def _anthropic_usage(usage: Any) -> dict[str, int]:
+    """Token usage from an Anthropic response, including prompt-cache counters."""
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+    }
+
+
+def _chat_usage(usage: Any) -> dict[str, int]:
+    """Token usage from an OpenAI-style response."""
+    if usage is None:
+        return {"input_tokens": 0, "output_tokens": 0}
+    result = {
+        "input_tokens": usage.prompt_tokens,
+        "output_tokens": usage.completion_tokens,
+    }
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None and getattr(details, "cached_tokens", None) is not None:
+        result["cache_read_input_tokens"] = details.cached_tokens
+    return result
+
+
 class LLMProvider:
     """Unified interface for LLM providers."""
     
@@ -48,26 +171,27 @@ class LLMProvider:
         model: str | None = None,
         cache_dir: str | None = None,
         cache_ttl: int = 3600,
+        similarity_threshold: float | None = None,
     ):
         self.provider = provider
         self.cache_dir = Path(cache_dir) if cache_dir else None
         self.cache_ttl = cache_ttl
+        self.similarity_threshold = similarity_threshold
+        self._last_key_input: tuple | None = None
         
         if provider == "groq":
             # FREE TIER - Recommended for testing
-            if not Groq:
-                raise ImportError("pip install groq")
+            groq = _sdk("groq")
             api_key = os.environ.get("GROQ_API_KEY")
             if not api_key:
                 raise ValueError(
                     "GROQ_API_KEY not set. Get FREE key at https://console.groq.com\n"
                     "  export GROQ_API_KEY='your-key-here'"
                 )
-            self.client = Groq(api_key=api_key)
+            self.client = groq.Groq(api_key=api_key)
             self.model = model or "llama-3.3-70b-versatile"  # Fast & free
         elif provider == "anthropic":
-            if not anthropic:
-                raise ImportError("pip install anthropic")
+            anthropic = _sdk("anthropic")
             api_key = os.environ.get("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError(
@@ -78,8 +202,7 @@ class LLMProvider:
             self.client = anthropic.Anthropic(api_key=api_key)
             self.model = model or "claude-sonnet-4-20250514"
         elif provider == "openai":
-            if not openai:
-                raise ImportError("pip install openai")
+            openai = _sdk("openai")
             api_key = os.environ.get("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError(
@@ -92,119 +215,348 @@ class LLMProvider:
         else:
             raise ValueError(f"Unknown provider: {provider}. Use: groq (free), anthropic, openai")
         
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
         if self.cache_dir:
             self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                self.cache_dir / "cache.db", check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, content TEXT, model TEXT, usage TEXT, ts REAL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE ts < ?", (time.time() - self.cache_ttl,))
+        
+        # Semantic tier: user-text embeddings whose values are cache.db keys
+        self._similar = (
+            ResponseCache(
+                self.cache_dir / "completions.db",
+                similarity_threshold=similarity_threshold,
+                ttl=cache_ttl,
+            )
+            if self.cache_dir and similarity_threshold is not None else None
+        )
+    
+    def _key_input(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None = None,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> tuple:
+        """Canonical request fields, in KEY_FIELDS order."""
+        return (
+            self.model,
+            round(temperature, 3) if temperature is not None else None,
+            max_tokens,
+            _canonical(system),
+            tuple((m.role, _canonical(m.content)) for m in messages),
+        )
     
     def _cache_key(self, messages: list[Message], **kwargs) -> str:
         """Generate cache key from request."""
-        data = {
-            "messages": [(m.role, m.content) for m in messages],
-            "model": self.model,
-            **kwargs
-        }
-        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        return _digest(self._key_input(messages, **kwargs))
+    
+    def _log_miss(self, key_input: tuple) -> None:
+        """Debug-log which fields differ from the previous request with the same opening message."""
+        last, self._last_key_input = self._last_key_input, key_input
+        if last is None or last[4][:1] != key_input[4][:1]:
+            return
+        changed = [name for name, a, b in zip(KEY_FIELDS, last, key_input) if a != b]
+        logger.debug(f"Cache miss; changed vs previous request: {', '.join(changed) or 'none'}")
     
     def _get_cached(self, key: str) -> LLMResponse | None:
         """Get cached response if valid."""
-        if not self.cache_dir:
-            return None
-        cache_file = self.cache_dir / f"{key}.json"
-        if not cache_file.exists():
+        if not self._db:
             return None
-        data = json.loads(cache_file.read_text())
-        if time.time() - data["timestamp"] > self.cache_ttl:
-            cache_file.unlink()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT content, model, usage FROM cache WHERE key = ? AND ts > ?",
+                (key, time.time() - self.cache_ttl),
+            ).fetchone()
+        if row is None:
             return None
+        content, model, usage = row
         return LLMResponse(
-            content=data["content"],
-            model=data["model"],
-            usage=data["usage"],
+            content=content,
+            model=model,
+            usage=_loads(usage),
             cached=True
         )
     
-    def _set_cached(self, key: str, response: LLMResponse) -> None:
-        """Cache a response."""
-        if not self.cache_dir:
+    def _set_cached(
+        self,
+        key: str,
+        response: LLMResponse,
+        semantic: tuple[str, str] | None = None,
+    ) -> None:
+        """Cache a response; ``semantic`` is its ``(namespace, text)`` for similarity lookup."""
+        if not self._db:
             return
-        cache_file = self.cache_dir / f"{key}.json"
-        cache_file.write_text(json.dumps({
-            "content": response.content,
-            "model": response.model,
-            "usage": response.usage,
-            "timestamp": time.time()
-        }))
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, content, model, usage, ts) VALUES (?, ?, ?, ?, ?)",
+                (key, response.content, response.model, _dumps(response.usage), time.time()),
+            )
+        if semantic:
+            namespace, text = semantic
+            self._similar.set(key, key, text, namespace)
+    
+    def _semantic_probe(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> tuple[str, str] | None:
+        """Namespace and user text of a request, if semantic caching applies.
+        
+        High temperatures ask for varied output, so they never match. The
+        namespace pins everything but the user text (model, system, assistant
+        turns, max_tokens) so only paraphrases of the same request can hit.
+        """
+        if not self._similar or not self._similar.semantic or temperature > 0.3:
+            return None
+        text = "\n\n".join(_content_text(m.content) for m in messages if m.role == "user")
+        namespace = self._cache_key(
+            [m for m in messages if m.role != "user"], system=system, max_tokens=max_tokens
+        )
+        return namespace, text
+    
+    def _get_similar(self, namespace: str, text: str) -> LLMResponse | None:
+        """Most similar cached response in ``namespace`` above the threshold."""
+        key = self._similar.find_similar(text, namespace)
+        return self._get_cached(key) if key else None
+    
+    def _lookup(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> tuple[str, LLMResponse | None, tuple[str, str] | None]:
+        """Exact then semantic cache lookup.
+        
+        Returns the cache key, the cached response if any, and the semantic
+        probe to store with a fresh response.
+        """
+        key_input = self._key_input(messages, system, max_tokens, temperature)
+        cache_key = _digest(key_input)
+        if not self._db:
+            return cache_key, None, None
+        cached = self._get_cached(cache_key)
+        if cached:
+            return cache_key, cached, None
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_miss(key_input)
+        semantic = self._semantic_probe(messages, system, max_tokens, temperature)
+        if semantic:
+            cached = self._get_similar(*semantic)
+        return cache_key, cached, semantic
     
     def complete(
         self,
         messages: list[Message],
-        system: str | None = None,
+        system: str | list[str] | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        cache: bool = True,
         **kwargs
     ) -> LLMResponse:
-        """Get completion from LLM."""
+        """Get completion from LLM.
+        
+        ``cache=False`` bypasses the response cache, for callers that keep
+        their own (see ``BaseAgent.ask_cached``).
+        """
+        if not cache:
+            return self._complete(messages, system, max_tokens, temperature)
+        
         # Check cache
-        cache_key = self._cache_key(messages, system=system, max_tokens=max_tokens, temperature=temperature)
-        cached = self._get_cached(cache_key)
+        cache_key, cached, semantic = self._lookup(messages, system, max_tokens, temperature)
         if cached:
             return cached
         
+        response = self._complete(messages, system, max_tokens, temperature)
+        self._set_cached(cache_key, response, semantic)
+        return response
+    
+    def _complete(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> LLMResponse:
+        """Uncached completion from the configured provider."""
+        if self.provider == "anthropic":
+            return self._anthropic_complete(messages, system, max_tokens, temperature)
+        if self.provider == "groq":
+            return self._groq_complete(messages, system, max_tokens, temperature)
+        return self._openai_complete(messages, system, max_tokens, temperature)
+    
+    def complete_many(
+        self,
+        requests: list[CompletionRequest],
+        max_workers: int = 8,
+    ) -> list[LLMResponse]:
+        """Run independent completions concurrently, in request order.
+        
+        The SDK clients pool keep-alive connections, so concurrent requests
+        share connections instead of paying a handshake each.
+        """
+        def run(r: CompletionRequest) -> LLMResponse:
+            return self.complete(r.messages, r.system, r.max_tokens, r.temperature, **r.kwargs)
+        
+        if len(requests) <= 1:
+            return [run(r) for r in requests]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as pool:
+            return list(pool.map(run, requests))
+    
+    def stream_complete(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> Generator[str, None, LLMResponse]:
+        """Stream completion text as it is generated.
+        
+        Yields text chunks and returns the full response, which is cached
+        like complete(). A cache hit yields the whole content at once.
+        """
+        cache_key, cached, semantic = self._lookup(messages, system, max_tokens, temperature)
+        if cached:
+            yield cached.content
+            return cached
+        
         if self.provider == "anthropic":
-            response = self._anthropic_complete(messages, system, max_tokens, temperature)
-        elif self.provider == "groq":
-            response = self._groq_complete(messages, system, max_tokens, temperature)
+            response = yield from self._anthropic_stream(messages, system, max_tokens, temperature)
         else:
-            response = self._openai_complete(messages, system, max_tokens, temperature)
+            response = yield from self._chat_stream(messages, system, max_tokens, temperature)
         
-        self._set_cached(cache_key, response)
+        self._set_cached(cache_key, response, semantic)
         return response
     
+    def _anthropic_stream(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float
+    ) -> Generator[str, None, LLMResponse]:
+        """Anthropic streaming API call."""
+        kwargs = self._anthropic_request(messages, system, max_tokens, temperature)
+        parts = []
+        with self.client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                parts.append(text)
+                yield text
+            final = stream.get_final_message()
+        
+        return LLMResponse(
+            content="".join(parts),
+            model=final.model,
+            usage=_anthropic_usage(final.usage),
+        )
+    
+    def _chat_stream(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float
+    ) -> Generator[str, None, LLMResponse]:
+        """OpenAI/Groq streaming API call."""
+        extra = {"stream_options": {"include_usage": True}} if self.provider == "openai" else {}
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._chat_messages(messages, system),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **extra,
+        )
+        
+        parts = []
+        model = self.model
+        usage = None
+        for chunk in stream:
+            model = getattr(chunk, "model", None) or model
+            usage = getattr(chunk, "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                text = chunk.choices[0].delta.content
+                parts.append(text)
+                yield text
+        
+        return LLMResponse(
+            content="".join(parts),
+            model=model,
+            usage=_chat_usage(usage),
+        )
+    
     def _anthropic_complete(
         self,
         messages: list[Message],
-        system: str | None,
+        system: str | list[str] | None,
         max_tokens: int,
         temperature: float
     ) -> LLMResponse:
         """Anthropic API call."""
-        msg_list = [{"role": m.role, "content": m.content} for m in messages]
+        kwargs = self._anthropic_request(messages, system, max_tokens, temperature)
+        response = self.client.messages.create(**kwargs)
         
+        return LLMResponse(
+            content=response.content[0].text,
+            model=response.model,
+            usage=_anthropic_usage(response.usage),
+        )
+    
+    def _anthropic_request(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+        max_tokens: int,
+        temperature: float
+    ) -> dict[str, Any]:
+        """Build Anthropic request arguments."""
         kwargs = {
             "model": self.model,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "messages": msg_list,
+            "messages": [{"role": m.role, "content": _content_blocks(m.content)} for m in messages],
         }
         if system:
-            kwargs["system"] = system
-        
-        response = self.client.messages.create(**kwargs)
-        
-        return LLMResponse(
-            content=response.content[0].text,
-            model=response.model,
-            usage={
-                "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens,
-            }
-        )
+            kwargs["system"] = _system_blocks(system)
+        return kwargs
+    
+    def _chat_messages(
+        self,
+        messages: list[Message],
+        system: str | list[str] | None,
+    ) -> list[dict[str, Any]]:
+        """Build an OpenAI-style message list (also used by Groq)."""
+        # Prefix caching is automatic here; it only needs the system prompt
+        # to come first and stay byte-identical across calls.
+        msg_list = []
+        if system:
+            msg_list.append({"role": "system", "content": _system_text(system)})
+        msg_list.extend([{"role": m.role, "content": _content_text(m.content)} for m in messages])
+        return msg_list
     
     def _openai_complete(
         self,
         messages: list[Message],
-        system: str | None,
+        system: str | list[str] | None,
         max_tokens: int,
         temperature: float
     ) -> LLMResponse:
         """OpenAI API call."""
-        msg_list = []
-        if system:
-            msg_list.append({"role": "system", "content": system})
-        msg_list.extend([{"role": m.role, "content": m.content} for m in messages])
-        
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=msg_list,
+            messages=self._chat_messages(messages, system),
             max_tokens=max_tokens,
             temperature=temperature,
         )
@@ -212,28 +564,20 @@ class LLMProvider:
         return LLMResponse(
             content=response.choices[0].message.content,
             model=response.model,
-            usage={
-                "input_tokens": response.usage.prompt_tokens,
-                "output_tokens": response.usage.completion_tokens,
-            }
+            usage=_chat_usage(response.usage),
         )
 
     def _groq_complete(
         self,
         messages: list[Message],
-        system: str | None,
+        system: str | list[str] | None,
         max_tokens: int,
         temperature: float
     ) -> LLMResponse:
         """Groq API call (FREE tier available)."""
-        msg_list = []
-        if system:
-            msg_list.append({"role": "system", "content": system})
-        msg_list.extend([{"role": m.role, "content": m.content} for m in messages])
-
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=msg_list,
+            messages=self._chat_messages(messages, system),
             max_tokens=max_tokens,
             temperature=temperature,
         )
@@ -241,8 +585,5 @@ class LLMProvider:
         return LLMResponse(
             content=response.choices[0].message.content,
             model=response.model,
-            usage={
-                "input_tokens": response.usage.prompt_tokens,
-                "output_tokens": response.usage.completion_tokens,
-            }
+            usage=_chat_usage(response.usage),
         )
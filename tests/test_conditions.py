@@ -0,0 +1,60 @@
+"""Tests for local evaluation of workflow step conditions."""
+from agents.workflow.conditions import evaluate_condition
+
+
+def _context(**variables) -> dict:
+    """Context with one succeeded and one failed step."""
+    return {
+        "variables": variables,
+        "steps": {
+            "research": {"status": "success", "output": "findings"},
+            "publish": {"status": "error", "error": "timeout"},
+        },
+    }
+
+
+def test_bare_word_is_literal_only_against_a_lookup():
+    context = _context(mode="draft")
+    assert evaluate_condition("variables.mode == draft", context) is True
+    assert evaluate_condition("variables.mode != draft", context) is False
+    assert evaluate_condition("draft == final", context) is None
+    assert evaluate_condition("draft", context) is None
+
+
+def test_string_variables_compare_to_bools_and_numbers_by_value():
+    context = _context(publish="false", count="3")
+    assert evaluate_condition("variables.publish == true", context) is False
+    assert evaluate_condition("variables.publish == false", context) is True
+    assert evaluate_condition("variables.count > 2", context) is True
+
+
+def test_string_variable_as_truth_value_must_be_a_bool_word():
+    assert evaluate_condition("variables.publish", _context(publish="false")) is False
+    assert evaluate_condition("variables.publish", _context(publish="yes")) is True
+    assert evaluate_condition("not variables.publish", _context(publish="no")) is True
+    assert evaluate_condition("variables.publish", _context(publish="maybe")) is None
+    assert evaluate_condition("variables.publish", _context()) is False
+
+
+def test_step_reference_is_success_or_status():
+    context = _context()
+    assert evaluate_condition("steps.research", context) is True
+    assert evaluate_condition("steps.publish", context) is False
+    assert evaluate_condition("steps.missing", context) is False
+    assert evaluate_condition("steps.research == success", context) is True
+    assert evaluate_condition("steps.publish.status == error", context) is True
+    assert evaluate_condition("steps.research.output == 'findings'", context) is True
+    assert evaluate_condition("steps.research.tokens", context) is None
+
+
+def test_non_string_conditions_are_read_as_text():
+    context = _context()
+    assert evaluate_condition(True, context) is True
+    assert evaluate_condition(False, context) is False
+    assert evaluate_condition(0, context) is False
+
+
+def test_free_text_is_left_to_the_llm():
+    context = _context()
+    assert evaluate_condition("the research found something useful", context) is None
+    assert evaluate_condition("len(steps.research.output) > 3", context) is None
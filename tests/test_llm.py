@@ -0,0 +1,22 @@
+"""Tests for LLM request construction."""
+from core.llm import LLMProvider, Message
+
+
+def _provider(model: str = "claude-sonnet-4-20250514") -> LLMProvider:
+    """Provider with no client; request builders only need the model."""
+    provider = LLMProvider.__new__(LLMProvider)
+    provider.provider = "anthropic"
+    provider.model = model
+    return provider
+
+
+def test_anthropic_system_sent_as_cacheable_blocks():
+    request = _provider()._anthropic_request(
+        [Message(role="user", content="hi")],
+        system="You are helpful.",
+        max_tokens=16,
+        temperature=0.0,
+    )
+    assert isinstance(request["system"], list)
+    assert request["system"][-1]["text"] == "You are helpful."
+    assert request["system"][-1]["cache_control"] == {"type": "ephemeral"}
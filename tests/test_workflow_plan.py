@@ -0,0 +1,51 @@
+"""Tests for workflow step layering."""
+from agents.workflow.agent import WorkflowAgent, _EXAMPLE_WORKFLOWS_PARSED
+
+
+def _plan(steps: list[dict]) -> list[list[int]]:
+    """Layers for steps; planning needs no provider, so skip __init__."""
+    agent = WorkflowAgent.__new__(WorkflowAgent)
+    return agent._plan_layers(steps, [step["name"] for step in steps])
+
+
+def test_bundled_templates():
+    layers = {
+        name: _plan(workflow["steps"]) for name, workflow in _EXAMPLE_WORKFLOWS_PARSED.items()
+    }
+    assert layers == {
+        "content_pipeline": [[0], [1], [2], [3]],
+        "code_documentation": [[0], [1, 2]],
+    }
+
+
+def test_independent_steps_share_a_layer():
+    steps = [
+        {"name": "a", "prompt": "one"},
+        {"name": "b", "prompt": "two"},
+        {"name": "c", "prompt": "{{steps.a}} and {{steps.b}}"},
+        {"name": "d", "type": "transform", "input": "a", "transform": "upper"},
+    ]
+    assert _plan(steps) == [[0, 1], [2, 3]]
+
+
+def test_stop_last_output_and_conditions():
+    steps = [
+        {"name": "a", "prompt": "one"},
+        {"name": "b", "prompt": "two"},
+        {"name": "c", "prompt": "{{steps.a}}", "on_error": "stop"},
+        {"name": "d", "prompt": "after the stop step"},
+        {"name": "e", "prompt": "{{last_output}}"},
+        {"name": "f", "prompt": "{{steps.a}}", "condition": "steps.c"},
+        {"name": "g", "prompt": "three", "condition": "variables.g"},
+        {"name": "h", "prompt": "{{steps.f}}", "condition": "steps.f"},
+        {"name": "i", "type": "aggregate"},
+    ]
+    assert _plan(steps) == [
+        [0, 1],
+        [2],  # on_error: stop waits for the step it reads ...
+        [3],  # ... and everything after waits for it
+        [4],  # {{last_output}} reads every earlier step
+        [5, 6],  # consecutive conditions are checked together
+        [7],  # unless one references the other
+        [8],  # aggregate without inputs
+    ]